@@ -0,0 +1,122 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from app.logger import setup_logger
+
+# 設置日誌
+logger = setup_logger()
+
+# 產出檔案的存放目錄與保留的檔案數量
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "output")
+ARTIFACT_RETENTION = int(os.getenv("ARTIFACT_RETENTION", "24"))
+
+
+class ArtifactStore:
+    """以轉換後資料的內容雜湊為鍵值的產出檔案存放區，相同內容只產生一次"""
+
+    def __init__(self, root: Optional[str] = None, retention: Optional[int] = None):
+        self.root = root or ARTIFACT_DIR
+        self.retention = ARTIFACT_RETENTION if retention is None else retention
+        self.manifest_path = os.path.join(self.root, "manifest.json")
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        """讀取索引檔，不存在或損壞時重新建立"""
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            manifest.setdefault("objects", {})
+            manifest.setdefault("latest", {})
+            return manifest
+        except FileNotFoundError:
+            return {"objects": {}, "latest": {}}
+        except (ValueError, OSError) as e:
+            logger.warning(f"產出檔案索引無法讀取，重新建立: {e}")
+            return {"objects": {}, "latest": {}}
+
+    def _save_manifest(self):
+        """以暫存檔取代的方式寫入索引"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    @staticmethod
+    def content_hash(df: pd.DataFrame, kind: str) -> str:
+        """計算資料內容的雜湊"""
+        digest = hashlib.sha256(kind.encode("utf-8"))
+        digest.update(df.to_csv(index=False).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _abspath(self, relpath: str) -> str:
+        return os.path.join(self.root, relpath)
+
+    def get(self, content_hash: str) -> Optional[str]:
+        """依雜湊取得檔案路徑"""
+        entry = self.manifest["objects"].get(content_hash)
+        if entry and os.path.exists(self._abspath(entry["path"])):
+            return self._abspath(entry["path"])
+        return None
+
+    def latest(self, kind: str, year_month: str) -> Optional[str]:
+        """取得某類型在某月份的最新產出檔案"""
+        content_hash = self.manifest["latest"].get(f"{kind}/{year_month}")
+        return self.get(content_hash) if content_hash else None
+
+    def put(self, df: pd.DataFrame, kind: str, writer: Callable[[pd.DataFrame, str], None],
+            suffix: str = ".xlsx", month_column: str = "year_month") -> Tuple[str, bool]:
+        """保存產出檔案，內容已存在時略過產生；回傳 (路徑, 是否新產生)"""
+        content_hash = self.content_hash(df, kind)
+        path = self.get(content_hash)
+        created = path is None
+        if created:
+            relpath = os.path.join("objects", content_hash[:2], f"{kind}_{content_hash[:16]}{suffix}")
+            path = self._abspath(relpath)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先寫入暫存檔再改名，避免留下寫到一半的檔案
+            tmp_path = f"{path}.tmp{suffix}"
+            writer(df, tmp_path)
+            os.replace(tmp_path, path)
+            self.manifest["objects"][content_hash] = {
+                "path": relpath,
+                "kind": kind,
+                "created_at": datetime.now().isoformat(),
+            }
+            logger.info(f"已產生產出檔案: {path}")
+        else:
+            logger.info(f"內容未變動，沿用既有產出檔案: {path}")
+
+        if month_column in df.columns:
+            for year_month in df[month_column].dropna().unique():
+                self.manifest["latest"][f"{kind}/{year_month}"] = content_hash
+
+        self.enforce_retention()
+        self._save_manifest()
+        return path, created
+
+    def enforce_retention(self):
+        """各類型只保留最新 retention 個月份的最新檔案指標，再保留被指標引用及最新的 retention 個檔案，其餘刪除"""
+        latest = self.manifest["latest"]
+        months_by_kind: Dict[str, list] = {}
+        for key in latest:
+            kind, year_month = key.split("/", 1)
+            months_by_kind.setdefault(kind, []).append(year_month)
+        # 滾動視窗每次都會涵蓋新月份，舊月份的指標也須過期，否則舊檔案永遠不會被刪除
+        for kind, months in months_by_kind.items():
+            for year_month in sorted(months, reverse=True)[self.retention:]:
+                del latest[f"{kind}/{year_month}"]
+
+        objects = self.manifest["objects"]
+        referenced = set(latest.values())
+        newest = set(sorted(objects, key=lambda h: objects[h]["created_at"], reverse=True)[:self.retention])
+        for content_hash in [h for h in objects if h not in referenced and h not in newest]:
+            path = self._abspath(objects.pop(content_hash)["path"])
+            if os.path.exists(path):
+                os.remove(path)
+            logger.info(f"已刪除過期產出檔案: {path}")
@@ -0,0 +1,161 @@
+import calendar
+import hashlib
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.logger import setup_logger
+
+# 設置日誌
+logger = setup_logger()
+
+# 數據世代重新確認的間隔（秒），避免每個請求都查詢資料庫
+GENERATION_TTL = int(os.getenv("DATA_GENERATION_TTL", "60"))
+
+# 瀏覽器端快取時間（秒），CDN 則由 s-maxage 控制到下一次爬取
+CLIENT_MAX_AGE = int(os.getenv("CACHE_CLIENT_MAX_AGE", "0"))
+
+# s-maxage 的上限（秒），手動 /crawl 或延遲的爬取最晚在這段時間後反映到 CDN
+MAX_SHARED_AGE = int(os.getenv("CACHE_MAX_SHARED_AGE", "3600"))
+
+# 排程爬取時間（與 render.yaml 的 schedule 一致：每月 1 號 05:00 UTC）
+CRAWL_DAY = int(os.getenv("CRAWL_SCHEDULE_DAY", "1"))
+CRAWL_HOUR = int(os.getenv("CRAWL_SCHEDULE_HOUR", "5"))
+
+# 排程時間後的寬限期（秒），爬取可能尚未完成，期間只讓 CDN 短暫快取
+CRAWL_GRACE_SECONDS = int(os.getenv("CRAWL_GRACE_SECONDS", "21600"))
+
+
+class DataGeneration:
+    """記錄目前資料的世代，資料變動後世代即改變；主資料庫與讀取副本的世代分開記錄"""
+
+    def __init__(self, ttl: int = GENERATION_TTL):
+        self.ttl = ttl
+        self._values: Dict[Hashable, Tuple[str, float]] = {}
+
+    async def get(self, loader: Callable[[], Awaitable[str]], key: Hashable = None) -> str:
+        """取得 key（讀取資料的引擎）目前的世代，超過 TTL 時透過 loader 重新讀取"""
+        now = time.monotonic()
+        cached = self._values.get(key)
+        if cached is not None and now - cached[1] < self.ttl:
+            return cached[0]
+        value = await loader()
+        if cached is None or value != cached[0]:
+            logger.info(f"數據世代更新為: {value}")
+        self._values[key] = (value, now)
+        return value
+
+    def invalidate(self):
+        """爬取寫入後呼叫，強制下一個請求重新讀取世代"""
+        self._values.clear()
+
+
+data_generation = DataGeneration()
+
+
+def format_generation(count: int, last_id: Optional[int], last_created: Optional[datetime]) -> str:
+    """由資料筆數、最大 id 與最新寫入時間組成數據世代字串"""
+    return f"{count}:{last_id}:{last_created.isoformat() if last_created else ''}"
+
+
+def normalize_query(params: Dict[str, Optional[object]]) -> str:
+    """將查詢參數正規化為穩定字串（忽略空值並排序）"""
+    items = sorted((k, str(v)) for k, v in params.items() if v is not None)
+    return "&".join(f"{k}={v}" for k, v in items)
+
+
+def compute_etag(generation: str, path: str, normalized_query: str) -> str:
+    """由數據世代與正規化後的查詢計算 ETag"""
+    digest = hashlib.sha1(f"{generation}|{path}|{normalized_query}".encode("utf-8")).hexdigest()
+    # 回應可能經過 gzip 壓縮，因此使用弱驗證器
+    return f'W/"{digest}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """檢查 If-None-Match 是否符合目前的 ETag（弱比較）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def _scheduled_crawl(now: datetime, months_ahead: int) -> datetime:
+    """取得 now 所在月份往後 months_ahead 個月的排程爬取時間"""
+    month_index = now.year * 12 + now.month - 1 + months_ahead
+    year, month = month_index // 12, month_index % 12 + 1
+    # CRAWL_SCHEDULE_DAY 超過該月天數時（例如 31 號遇到 2 月）改用月底
+    day = min(CRAWL_DAY, calendar.monthrange(year, month)[1])
+    return now.replace(year=year, month=month, day=day, hour=CRAWL_HOUR, minute=0, second=0, microsecond=0)
+
+
+def seconds_until_next_crawl(now: Optional[datetime] = None) -> int:
+    """計算距離下一次排程爬取的秒數"""
+    now = now or datetime.now(timezone.utc)
+    candidate = _scheduled_crawl(now, 0)
+    if candidate <= now:
+        candidate = _scheduled_crawl(now, 1)
+    return max(int((candidate - now).total_seconds()), 0)
+
+
+def seconds_since_last_crawl(now: Optional[datetime] = None) -> int:
+    """計算距離上一次排程爬取的秒數"""
+    now = now or datetime.now(timezone.utc)
+    candidate = _scheduled_crawl(now, 0)
+    if candidate > now:
+        candidate = _scheduled_crawl(now, -1)
+    return int((now - candidate).total_seconds())
+
+
+def shared_max_age(now: Optional[datetime] = None) -> int:
+    """CDN 的快取時間：寬限期內只快取 GENERATION_TTL 秒，其餘時間不超過下一次爬取與 MAX_SHARED_AGE"""
+    now = now or datetime.now(timezone.utc)
+    if seconds_since_last_crawl(now) < CRAWL_GRACE_SECONDS:
+        return min(GENERATION_TTL, MAX_SHARED_AGE)
+    return min(seconds_until_next_crawl(now), MAX_SHARED_AGE)
+
+
+def cache_headers(etag: str) -> Dict[str, str]:
+    """產生讀取端點共用的快取標頭"""
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={CLIENT_MAX_AGE}, s-maxage={shared_max_age()}, must-revalidate",
+    }
+
+
+class PrecompressedGZipMiddleware:
+    """gzip 壓縮回應，但已帶 Content-Encoding 的回應（預先壓縮的快照）原樣送出"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        bypass = False
+
+        async def app_with_bypass(scope: Scope, receive: Receive, gzip_send: Send):
+            async def route_send(message: Message):
+                nonlocal bypass
+                if message["type"] == "http.response.start":
+                    bypass = any(key.lower() == b"content-encoding" for key, _ in message.get("headers", []))
+                await (send if bypass else gzip_send)(message)
+            await self.app(scope, receive, route_send)
+
+        await GZipMiddleware(app_with_bypass, minimum_size=self.minimum_size)(scope, receive, send)
@@ -0,0 +1,230 @@
+"""可註冊的資料來源
+
+每個來源宣告網址、表格定位方式、轉換函式、目標資料表與去重鍵值，
+由 ExtractorRunner 透過共用連線池同時抓取；各站進出站旅客人數表格註冊於 app/crawler/sources.py。
+"""
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import io
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from pyquery import PyQuery as pq
+import pandas as pd
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm import Session
+
+from app.profiling import NullProfiler, profile_stage
+from app.logger import setup_logger
+
+# 設置日誌
+logger = setup_logger()
+
+# 同時抓取的來源數量上限
+MAX_WORKERS = int(os.getenv("EXTRACTOR_MAX_WORKERS", "4"))
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+def css_locator(selector: str) -> Callable[[str], Optional[pq]]:
+    """以 CSS 選擇器定位表格"""
+    def locate(content: str) -> Optional[pq]:
+        tables = pq(content)(selector)
+        if len(tables) == 1:
+            return tables
+        logger.warning(f"選擇器 {selector} 找到 {len(tables)} 個表格")
+        return None
+    return locate
+
+
+def tab_locator(tab_text: str) -> Callable[[str], Optional[pq]]:
+    """以分頁按鈕文字定位表格（按鈕的 href 指向表格所在的 div）"""
+    def locate(content: str) -> Optional[pq]:
+        doc = pq(content)
+        for element in doc("a, button").items():
+            href = element.attr("href") or element.attr("data-target") or ""
+            if tab_text in element.text().strip() and href.startswith("#"):
+                return css_locator(f"div{href}")(content)
+        logger.warning(f"未找到分頁按鈕: {tab_text}")
+        return None
+    return locate
+
+
+class ExtractorSource:
+    """可註冊的資料來源：網址（None 時使用 runner 的 base_url）、表格定位方式、轉換結構、目標資料表與去重鍵值"""
+
+    def __init__(
+        self,
+        name: str,
+        url: Optional[str],
+        locate: Callable[[str], Optional[pq]],
+        transform: Callable[[pd.DataFrame], pd.DataFrame],
+        model,
+        key_columns: Sequence[str],
+        params: Optional[Dict] = None,
+        prepare: Optional[Callable[[Session, pd.DataFrame], None]] = None,
+    ):
+        if not key_columns:
+            raise ValueError(f"資料來源 {name} 必須指定 key_columns，避免每次爬取重複寫入")
+        self.name = name
+        self.url = url
+        self.locate = locate
+        self.transform = transform
+        self.model = model
+        self.key_columns = list(key_columns)
+        self.params = params or {}
+        # 寫入前的準備（例如建立分區），在寫入的交易內執行
+        self.prepare = prepare
+
+    def extract(self, content: str, profiler=None) -> pd.DataFrame:
+        """從網頁內容解析並轉換表格"""
+        profiler = profiler or NullProfiler()
+        with profiler.stage("parse"):
+            table = self.locate(content)
+        if table is None:
+            raise ValueError(f"來源 {self.name} 找不到目標表格")
+        with profiler.stage("read_html"), io.StringIO(str(table)) as f:
+            df = pd.read_html(f)[0]
+        with profiler.stage("transform"):
+            df = self.transform(df.dropna(how="all").reset_index(drop=True))
+        # 只保留目標資料表存在的欄位
+        columns = [c.name for c in self.model.__table__.columns if c.name in df.columns]
+        return df[columns]
+
+    def __repr__(self):
+        return f"<ExtractorSource(name='{self.name}', url='{self.url or '(base_url)'}', table='{self.model.__tablename__}')>"
+
+
+# 已註冊的資料來源
+EXTRACTORS: Dict[str, ExtractorSource] = {}
+
+
+def register_extractor(source: ExtractorSource) -> ExtractorSource:
+    """註冊資料來源"""
+    if source.name in EXTRACTORS:
+        raise ValueError(f"資料來源已註冊: {source.name}")
+    EXTRACTORS[source.name] = source
+    logger.info(f"註冊資料來源: {source}")
+    return source
+
+
+def get_extractors() -> List[ExtractorSource]:
+    """取得所有已註冊的資料來源"""
+    return list(EXTRACTORS.values())
+
+
+class ExtractorRunner:
+    """以共用連線池同時抓取並解析所有資料來源"""
+
+    def __init__(self, sources: Optional[List[ExtractorSource]] = None, max_workers: int = MAX_WORKERS,
+                 session: Optional[requests.Session] = None, headers: Optional[Dict] = None,
+                 base_url: Optional[str] = None, profiler=None):
+        self.sources = get_extractors() if sources is None else sources
+        self.max_workers = max(1, max_workers)
+        self.headers = headers or DEFAULT_HEADERS
+        self.base_url = base_url
+        self.profiler = profiler or NullProfiler()
+        if session is None:
+            session = requests.Session()
+            # 另外保留一個連線給主執行緒，避免連線池滿時丟棄連線
+            adapter = HTTPAdapter(pool_connections=self.max_workers + 1, pool_maxsize=self.max_workers + 1)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def fetch_key(self, source: ExtractorSource) -> Tuple[str, Tuple]:
+        """相同網址與參數的來源只需抓取一次"""
+        url = source.url or self.base_url
+        if not url:
+            raise ValueError(f"資料來源 {source.name} 沒有網址，且未指定 base_url")
+        return url, tuple(sorted(source.params.items()))
+
+    def fetch(self, url: str, params: Dict) -> str:
+        """抓取網頁內容"""
+        with self.profiler.stage("fetch"):
+            response = self.session.get(url, headers=self.headers, params=params or None, timeout=30)
+            response.raise_for_status()
+            if response.status_code == 304 or not response.text:
+                raise ValueError(f"網頁沒有回傳內容，狀態碼: {response.status_code}")
+            return response.text
+
+    def _fetch_and_extract(self, key: Tuple[str, Tuple], sources: List[ExtractorSource]) -> Dict[str, pd.DataFrame]:
+        """抓取一個網頁並解析所有使用該網頁的來源"""
+        url, params = key
+        content = self.fetch(url, dict(params))
+        results = {}
+        for source in sources:
+            try:
+                results[source.name] = source.extract(content, self.profiler)
+            except Exception as e:
+                logger.error(f"解析資料來源 {source.name} 時發生錯誤: {e}")
+        return results
+
+    def extract_all(self) -> Dict[str, pd.DataFrame]:
+        """同時抓取並解析所有資料來源"""
+        groups: Dict[Tuple, List[ExtractorSource]] = {}
+        for source in self.sources:
+            groups.setdefault(self.fetch_key(source), []).append(source)
+
+        results: Dict[str, pd.DataFrame] = {}
+        if not groups:
+            return results
+        if len(groups) == 1:
+            # 只有一個網頁時直接在目前的執行緒抓取
+            key, group = next(iter(groups.items()))
+            try:
+                results.update(self._fetch_and_extract(key, group))
+            except Exception as e:
+                logger.error(f"抓取 {key[0]} 時發生錯誤: {e}")
+            return results
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups))) as executor:
+            futures = {executor.submit(self._fetch_and_extract, key, group): key for key, group in groups.items()}
+            for future in as_completed(futures):
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    logger.error(f"抓取 {futures[future][0]} 時發生錯誤: {e}")
+        return results
+
+    def new_records(self, db: Session, source: ExtractorSource, df: pd.DataFrame) -> List[Dict]:
+        """依 key_columns 去除重複及資料表中已存在的資料"""
+        df = df.drop_duplicates(subset=source.key_columns)
+        records = df.astype(object).where(pd.notna(df), None).to_dict(orient="records")
+        if not records:
+            return []
+        table = source.model.__table__
+        key_columns = [table.c[name] for name in source.key_columns]
+        keys = [tuple(record[name] for name in source.key_columns) for record in records]
+        existing = {tuple(row) for row in db.execute(select(*key_columns).where(tuple_(*key_columns).in_(keys)))}
+        return [record for record, key in zip(records, keys) if key not in existing]
+
+    @profile_stage("db")
+    def save(self, db: Session, source: ExtractorSource, df: pd.DataFrame) -> bool:
+        """以單一交易批次寫入一個來源的新資料（已存在的鍵值略過）"""
+        try:
+            if source.prepare is not None and not df.empty:
+                source.prepare(db, df)
+            records = self.new_records(db, source, df)
+            if not records:
+                logger.info(f"資料來源 {source.name} 沒有新資料需要寫入")
+                return True
+            db.execute(insert(source.model.__table__), records)
+            db.commit()
+            logger.info(f"資料來源 {source.name} 已寫入 {len(records)} 筆資料到 {source.model.__tablename__}")
+            return True
+        except Exception as e:
+            logger.error(f"寫入資料來源 {source.name} 時發生錯誤: {e}")
+            db.rollback()
+            return False
+
+    def run(self, db: Optional[Session] = None) -> Dict[str, pd.DataFrame]:
+        """抓取所有來源，若提供資料庫會話則逐一寫入"""
+        results = self.extract_all()
+        if db is not None:
+            for source in self.sources:
+                if source.name in results:
+                    self.save(db, source, results[source.name])
+        return results
@@ -0,0 +1,62 @@
+"""預設註冊的資料來源：高鐵各站進出站旅客人數表格"""
+from typing import Callable
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from app.crawler.extractors import ExtractorSource, register_extractor, tab_locator
+from app.database.models import StationData, month_from_year_month
+from app.database.partitions import ensure_partitions
+from app.logger import setup_logger
+
+# 設置日誌
+logger = setup_logger()
+
+# 表格的車站欄位，依路線順序排列（總計排在最後）
+STATIONS = ["南港", "台北", "板橋", "桃園", "新竹", "苗栗", "台中", "彰化", "雲林", "嘉義", "台南", "左營", "總計"]
+
+# 同一月份、車站、進出站只保存一筆
+STATION_KEY_COLUMNS = ["year_month", "station", "entry_exit"]
+
+
+def drop_invalid_months(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """移除年月無法解析的列（例如合計列或空白列），逐列記錄警告"""
+    valid = []
+    for index, value in df[column].items():
+        try:
+            month_from_year_month(value)
+            valid.append(index)
+        except ValueError:
+            logger.warning(f"略過年月無法解析的列 {index}: {value!r}")
+    return df.loc[valid]
+
+
+def passenger_transform(entry_exit: str) -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """將每站一欄的寬表轉為每月每站一筆的長表"""
+    def transform(df: pd.DataFrame) -> pd.DataFrame:
+        df = drop_invalid_months(df, "年度 / 月份")
+        df = df.melt(id_vars=["年度 / 月份"], value_vars=STATIONS, var_name="station", value_name="visitor_number")
+        df = df.rename(columns={"年度 / 月份": "year_month"})
+        df["station_sequence"] = df["station"].map({station: i for i, station in enumerate(STATIONS, start=1)})
+        df["entry_exit"] = entry_exit
+        logger.info(f"資料轉換完成，進出站類型: {entry_exit}，共 {len(df)} 筆")
+        return df
+    return transform
+
+
+def prepare_partitions(db: Session, df: pd.DataFrame):
+    """確保寫入的年度都有對應的分區"""
+    years = {month_from_year_month(v).year for v in df["year_month"].dropna()}
+    ensure_partitions(db.connection(), years=years)
+
+
+for name, entry_exit in (("entry_passenger_table", "進站"), ("exit_passenger_table", "出站")):
+    register_extractor(ExtractorSource(
+        name=name,
+        url=None,  # 使用 HSRAnalyzer 的 base_url（可由 THSR_BASE_URL 覆寫）
+        locate=tab_locator(entry_exit),
+        transform=passenger_transform(entry_exit),
+        model=StationData,
+        key_columns=STATION_KEY_COLUMNS,
+        prepare=prepare_partitions,
+    ))
@@ -1,7 +1,10 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.ext.declarative import declarative_base as old_declarative_base
 import os
+import time
 from dotenv import load_dotenv
 from app.logger import setup_logger
 
@@ -29,16 +32,60 @@ else:
     SQLALCHEMY_DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     logger.info(f"使用本地資料庫 URL: {SQLALCHEMY_DATABASE_URL}")
 
+# 讀取副本（可選），未設定時讀寫都使用主資料庫
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL")
+if SQLALCHEMY_READ_DATABASE_URL:
+    SQLALCHEMY_READ_DATABASE_URL = SQLALCHEMY_READ_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+    logger.info(f"使用讀取副本 URL: {SQLALCHEMY_READ_DATABASE_URL}")
+
+# 寫入後在這段時間內讀取改走主資料庫，確保讀得到剛寫入的資料
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "30"))
+
 logger.info(f"環境變數 DATABASE_URL: {os.getenv('DATABASE_URL')}")
 logger.info(f"環境變數 DB_HOST: {os.getenv('DB_HOST')}")
 logger.info(f"環境變數 DB_USER: {os.getenv('DB_USER')}")
 
 # 創建數據庫引擎
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
 
 # 創建會話工廠
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def to_async_url(url: str) -> str:
+    """將 PostgreSQL 連線字串轉換為 asyncpg 驅動"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+    return parsed.render_as_string(hide_password=False)
+
+# 創建非同步數據庫引擎（供讀取端點使用，不阻塞事件迴圈）
+ASYNC_SQLALCHEMY_DATABASE_URL = to_async_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
+
+# 創建非同步會話工廠
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# 讀取副本使用獨立的連線池
+if SQLALCHEMY_READ_DATABASE_URL:
+    async_read_engine = create_async_engine(to_async_url(SQLALCHEMY_READ_DATABASE_URL), pool_pre_ping=True)
+else:
+    async_read_engine = async_engine
+
+AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, expire_on_commit=False)
+
+# 最近一次在主資料庫提交的時間（只記錄本行程的寫入，其他行程的寫入不會影響）
+_last_primary_write = 0.0
+
+@event.listens_for(engine, "commit")
+def mark_primary_write(*args):
+    """記錄主資料庫的提交時間"""
+    global _last_primary_write
+    _last_primary_write = time.monotonic()
+
+def reads_use_primary() -> bool:
+    """寫入後的短時間內，讀取改走主資料庫"""
+    return time.monotonic() - _last_primary_write < READ_YOUR_WRITES_SECONDS
+
 # 創建基類
 Base = declarative_base()
 
@@ -48,4 +95,10 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_read_db():
+    """獲取讀取用非同步數據庫會話（讀取副本，寫入後短時間內改用主資料庫）"""
+    factory = AsyncSessionLocal if reads_use_primary() else AsyncReadSessionLocal
+    async with factory() as db:
+        yield db
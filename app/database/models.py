@@ -1,15 +1,32 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float
+from sqlalchemy import Column, Integer, String, DateTime, Float, Date, Index
 from sqlalchemy.orm import declarative_base
-from datetime import datetime
+from datetime import datetime, date
+import re
 
 Base = declarative_base()
 
+def month_from_year_month(year_month: str) -> date:
+    """將 'YYYY-MM' 轉換為該月第一天"""
+    match = re.match(r'^\s*(\d{4})\D+(\d{1,2})', str(year_month))
+    if not match:
+        raise ValueError(f"無法解析年月: {year_month}")
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+def _default_month(context) -> date:
+    """由 year_month 推導分區鍵 month"""
+    return month_from_year_month(context.get_current_parameters()["year_month"])
+
 class StationData(Base):
-    """車站數據模型"""
+    """車站數據模型（依 month 以年為單位分區）"""
     __tablename__ = "hsr_vis_data"
+    __table_args__ = (
+        Index("ix_hsr_vis_data_month_brin", "month", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (month)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
-    year_month = Column(String, index=True)  # 年度/月份
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
+    month = Column(Date, primary_key=True, default=_default_month)  # 月份（分區鍵，該月第一天）
+    year_month = Column(String)  # 年度/月份
     station_sequence = Column(Integer)  # 車站序號
     station = Column(String)  # 車站名稱
     visitor_number = Column(Integer)  # 旅客人數
@@ -17,4 +34,20 @@ class StationData(Base):
     created_at = Column(DateTime, default=datetime.now)  # 創建時間
 
     def __repr__(self):
-        return f"<StationData(year_month='{self.year_month}', station='{self.station}', visitor_number={self.visitor_number}, entry_exit='{self.entry_exit}')>" 
\ No newline at end of file
+        return f"<StationData(year_month='{self.year_month}', station='{self.station}', visitor_number={self.visitor_number}, entry_exit='{self.entry_exit}')>"
+
+class StationYearlyData(Base):
+    """超過保留期限的分區彙總為年度資料"""
+    __tablename__ = "hsr_vis_data_yearly"
+
+    id = Column(Integer, primary_key=True, index=True)
+    year = Column(Integer, index=True)  # 年度
+    station_sequence = Column(Integer)  # 車站序號
+    station = Column(String)  # 車站名稱
+    visitor_number = Column(Integer)  # 年度旅客人數
+    entry_exit = Column(String)  # 進出站類型
+    months = Column(Integer)  # 彙總的月份數
+    created_at = Column(DateTime, default=datetime.now)  # 創建時間
+
+    def __repr__(self):
+        return f"<StationYearlyData(year={self.year}, station='{self.station}', visitor_number={self.visitor_number}, entry_exit='{self.entry_exit}')>"
@@ -0,0 +1,122 @@
+import argparse
+import os
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.database.models import Base, StationData, StationYearlyData
+from app.logger import setup_logger
+
+# 設置日誌
+logger = setup_logger()
+
+PARENT_TABLE = StationData.__tablename__
+
+# 高鐵 2007 年通車，建立分區時由此年開始
+FIRST_YEAR = int(os.getenv("PARTITION_FIRST_YEAR", "2007"))
+
+# 預先建立未來幾年的分區
+PARTITIONS_AHEAD = int(os.getenv("PARTITIONS_AHEAD", "2"))
+
+def partition_name(year: int) -> str:
+    """年度分區的資料表名稱"""
+    return f"{PARENT_TABLE}_y{year}"
+
+def _run(bind, callback):
+    """接受 Engine 或 Connection，Engine 時自行開啟交易"""
+    if isinstance(bind, Engine):
+        with bind.begin() as conn:
+            return callback(conn)
+    return callback(bind)
+
+def existing_partitions(bind) -> List[str]:
+    """列出目前已存在的分區"""
+    def query(conn: Connection) -> List[str]:
+        rows = conn.execute(text("""
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class parent ON pg_inherits.inhparent = parent.oid
+            JOIN pg_class child ON pg_inherits.inhrelid = child.oid
+            WHERE parent.relname = :parent
+            ORDER BY child.relname
+        """), {"parent": PARENT_TABLE})
+        return [row[0] for row in rows]
+    return _run(bind, query)
+
+def ensure_partitions(bind, years: Optional[Iterable[int]] = None, ahead: int = PARTITIONS_AHEAD) -> List[str]:
+    """建立指定年度與未來 ahead 年的分區（已存在者略過）"""
+    current_year = datetime.now().year
+    wanted = set(years or [])
+    wanted.update(range(current_year, current_year + ahead + 1))
+
+    def create(conn: Connection) -> List[str]:
+        existing = set(existing_partitions(conn))
+        created = []
+        for year in sorted(wanted):
+            name = partition_name(year)
+            if name in existing:
+                continue
+            conn.execute(text(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{PARENT_TABLE}" '
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+            ))
+            created.append(name)
+        if created:
+            logger.info(f"已建立分區: {created}")
+        return created
+    return _run(bind, create)
+
+def create_schema(bind) -> List[str]:
+    """建立資料表與自通車年度起的所有分區"""
+    def create(conn: Connection) -> List[str]:
+        Base.metadata.create_all(bind=conn)
+        return ensure_partitions(conn, years=range(FIRST_YEAR, datetime.now().year + 1))
+    return _run(bind, create)
+
+def apply_retention(bind, keep_years: int) -> List[str]:
+    """將超過保留年數的分區彙總為年度資料後卸離並刪除"""
+    cutoff = datetime.now().year - keep_years + 1
+
+    def retain(conn: Connection) -> List[str]:
+        Base.metadata.create_all(bind=conn, tables=[StationYearlyData.__table__])
+        dropped = []
+        for name in existing_partitions(conn):
+            year = int(name.rsplit("_y", 1)[1])
+            if year >= cutoff:
+                continue
+            conn.execute(text(f"""
+                INSERT INTO "{StationYearlyData.__tablename__}"
+                    (year, station_sequence, station, visitor_number, entry_exit, months, created_at)
+                SELECT :year, MIN(station_sequence), station, SUM(visitor_number), entry_exit,
+                       COUNT(DISTINCT month), now()
+                FROM "{name}"
+                GROUP BY station, entry_exit
+            """), {"year": year})
+            conn.execute(text(f'ALTER TABLE "{PARENT_TABLE}" DETACH PARTITION "{name}"'))
+            conn.execute(text(f'DROP TABLE "{name}"'))
+            dropped.append(name)
+        if dropped:
+            logger.info(f"已彙總並刪除分區: {dropped}")
+        return dropped
+    return _run(bind, retain)
+
+def main(argv: Optional[List[str]] = None):
+    """建立未來分區並套用保留政策，可排程執行"""
+    parser = argparse.ArgumentParser(description="管理 hsr_vis_data 的年度分區")
+    parser.add_argument("--ahead", type=int, default=PARTITIONS_AHEAD, help="預先建立未來幾年的分區")
+    parser.add_argument("--retain-years", type=int,
+                        default=int(os.environ["PARTITION_RETENTION_YEARS"]) if os.getenv("PARTITION_RETENTION_YEARS") else None,
+                        help="只保留最近幾年的月資料，較舊的彙總為年度資料（預設全部保留）")
+    args = parser.parse_args(argv)
+
+    from app.database.database import engine
+
+    ensure_partitions(engine, ahead=args.ahead)
+    if args.retain_years:
+        apply_retention(engine, args.retain_years)
+    logger.info(f"目前分區: {existing_partitions(engine)}")
+
+if __name__ == "__main__":
+    main()
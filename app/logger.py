@@ -1,28 +1,31 @@
 import logging
+from logging.handlers import RotatingFileHandler
 import sys
-from datetime import datetime
 import os
 
+# 日誌檔案大小上限與保留的備份數量
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
 # 全局變量，用於存儲是否已經初始化過 logger
 _logger_initialized = False
 
 def setup_logger():
     global _logger_initialized
     
-    # 創建 logs 目錄（如果不存在）
-    if not os.path.exists("logs"):
-        os.makedirs("logs")
-    
-    # 生成帶時間戳的日誌文件名
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = f"logs/hsr_crawler_{timestamp}.log"
-    
     # 配置日誌記錄器
     logger = logging.getLogger("hsr_crawler")
     
     # 如果已經初始化過，直接返回 logger
     if _logger_initialized:
         return logger
+    
+    # 創建 logs 目錄（如果不存在）
+    if not os.path.exists("logs"):
+        os.makedirs("logs")
+    
+    # 固定的日誌文件名，超過大小上限時輪替，避免檔案無限增加
+    log_file = "logs/hsr_crawler.log"
         
     # 設置日誌級別
     logger.setLevel(logging.INFO)
@@ -38,7 +41,7 @@ def setup_logger():
     logger.addHandler(console_handler)
     
     # 添加文件處理器
-    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    file_handler = RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding='utf-8')
     file_handler.setFormatter(formatter)
     logger.addHandler(file_handler)
     
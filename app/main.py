@@ -1,18 +1,27 @@
 import uvicorn
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import func, select, literal, union_all, Integer
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel, field_validator
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 import logging
 from datetime import datetime
 import os
 import re
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database.database import get_db, Base, engine
-from app.database.models import StationData
+from app.database.database import get_db, get_async_read_db, Base, engine
+from app.database.models import StationData, month_from_year_month
 from app.crawler.scraper import HSRAnalyzer
 from app.logger import setup_logger
+from app.cache import (
+    data_generation, format_generation, normalize_query, compute_etag, etag_matches, cache_headers,
+    PrecompressedGZipMiddleware
+)
+from app.snapshots import SNAPSHOT_FILES, current_version, snapshot_path
+from app.profiling import CrawlProfiler, PROFILE_FILES, list_profiles, load_profile, profile_path
 
 # 設置日誌
 logger = setup_logger()
@@ -31,8 +40,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# 壓縮較大的回應內容（預先壓縮的快照除外）
+app.add_middleware(PrecompressedGZipMiddleware, minimum_size=1000)
+
 class CrawlRequest(BaseModel):
     year_month: str
     save_all: bool = False
@@ -51,19 +64,86 @@ VALID_STATIONS = {
     "彰化", "雲林", "嘉義", "台南", "左營"
 }
 
+# 查詢參數 year_month 的格式（月份限定 01-12）
+YEAR_MONTH_PATTERN = r'^\d{4}-(0[1-9]|1[0-2])$'
+
+# 批次查詢的子查詢數量上限
+MAX_BATCH_QUERIES = int(os.getenv("MAX_BATCH_QUERIES", "50"))
+
+class DataQuery(BaseModel):
+    """單一查詢條件，驗證規則與 GET /data 相同"""
+    model_config = ConfigDict(extra="forbid")
+
+    key: Optional[str] = Field(None, max_length=100, description="結果的鍵值，未指定時使用序號")
+    year_month: Optional[str] = Field(None, pattern=YEAR_MONTH_PATTERN, description="格式必須為 YYYY-MM")
+    station: Optional[str] = Field(None, description="車站名稱")
+    visitor_number: Optional[int] = Field(None, ge=0, description="旅客人數必須大於等於 0")
+    entry_exit: Optional[str] = Field(None, pattern=r'^(進站|出站)$', description="必須為 '進站' 或 '出站'")
+
+    @field_validator('station')
+    @classmethod
+    def validate_station(cls, v: Optional[str]) -> Optional[str]:
+        if v and v not in VALID_STATIONS:
+            raise ValueError(f"無效的車站名稱: {v}")
+        return v
+
+class BatchDataRequest(BaseModel):
+    """批次查詢請求"""
+    model_config = ConfigDict(extra="forbid")
+
+    queries: List[DataQuery] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+
+    @field_validator('queries')
+    @classmethod
+    def validate_unique_keys(cls, v: List[DataQuery]) -> List[DataQuery]:
+        keys = [q.key if q.key is not None else str(i) for i, q in enumerate(v)]
+        if len(keys) != len(set(keys)):
+            raise ValueError("queries 的 key 不可重複")
+        return v
+
+def apply_data_filters(query, year_month: Optional[str] = None, station: Optional[str] = None,
+                       visitor_number: Optional[int] = None, entry_exit: Optional[str] = None):
+    """套用 /data 的查詢條件"""
+    if year_month:
+        # 以分區鍵 month 篩選，讓資料庫只掃描對應年度的分區
+        query = query.where(StationData.month == month_from_year_month(year_month))
+    if station:
+        query = query.where(StationData.station == station)
+    if visitor_number is not None:
+        query = query.where(StationData.visitor_number == visitor_number)
+    if entry_exit:
+        query = query.where(StationData.entry_exit == entry_exit)
+    return query
+
+async def load_data_generation(db: AsyncSession) -> str:
+    """由資料筆數與最新寫入時間組成數據世代"""
+    result = await db.execute(select(
+        func.count(StationData.id), func.max(StationData.id), func.max(StationData.created_at)
+    ))
+    return format_generation(*result.one())
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to HSR Crawler API"}
 
 @app.post("/crawl")
-async def crawl_data(request: CrawlRequest, db: Session = Depends(get_db)):
+def crawl_data(
+    request: CrawlRequest,
+    profile: bool = Query(False, description="是否記錄執行分析"),
+    db: Session = Depends(get_db)
+):
+    """觸發爬蟲（爬取為阻塞操作，以一般函式定義讓 FastAPI 在執行緒池中執行，不阻塞讀取端點）"""
     try:
         logger.info("開始執行爬蟲...")
-        analyzer = HSRAnalyzer()
+        analyzer = HSRAnalyzer(profiler=CrawlProfiler() if profile else None)
         analyzer.analyze_structure(db)
+        data_generation.invalidate()
             
         logger.info("爬蟲執行完成")
-        return {"message": "Data crawled and saved successfully"}
+        result = {"message": "Data crawled and saved successfully"}
+        if analyzer.profiler.run_id:
+            result["profile_id"] = analyzer.profiler.run_id
+        return result
     except Exception as e:
         logger.error(f"爬蟲執行時發生錯誤: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -71,11 +151,12 @@ async def crawl_data(request: CrawlRequest, db: Session = Depends(get_db)):
 @app.get("/data")
 async def get_data(
     request: Request,
-    year_month: Optional[str] = Query(None, pattern=r'^\d{4}-\d{2}$', description="格式必須為 YYYY-MM"),
+    response: Response,
+    year_month: Optional[str] = Query(None, pattern=YEAR_MONTH_PATTERN, description="格式必須為 YYYY-MM"),
     station: Optional[str] = Query(None, description="車站名稱"),
     visitor_number: Optional[int] = Query(None, ge=0, description="旅客人數必須大於等於 0"),
     entry_exit: Optional[str] = Query(None, pattern=r'^(進站|出站)$', description="必須為 '進站' 或 '出站'"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """查詢數據"""
     try:
@@ -90,18 +171,33 @@ async def get_data(
         if station and station not in VALID_STATIONS:
             raise HTTPException(status_code=422, detail=f"無效的車站名稱: {station}")
 
-        query = db.query(StationData)
-        
-        if year_month:
-            query = query.filter(StationData.year_month == year_month)
-        if station:
-            query = query.filter(StationData.station == station)
-        if visitor_number is not None:
-            query = query.filter(StationData.visitor_number == visitor_number)
-        if entry_exit:
-            query = query.filter(StationData.entry_exit == entry_exit)
-            
-        results = query.all()
+        # 依數據世代與查詢條件計算 ETag，符合時直接回傳 304；
+        # 世代依提供回應內容的引擎（主資料庫或讀取副本）分開快取，避免副本的舊資料帶上主資料庫的 ETag
+        generation = await data_generation.get(lambda: load_data_generation(db), key=db.bind)
+        etag = compute_etag(generation, request.url.path, normalize_query({
+            "year_month": year_month,
+            "station": station,
+            "visitor_number": visitor_number,
+            "entry_exit": entry_exit,
+        }))
+        headers = cache_headers(etag)
+        if etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
+
+        # 不帶篩選或只篩選年月時，若快照與目前的數據世代一致，直接回傳預先壓縮的快照檔案
+        if station is None and visitor_number is None and entry_exit is None \
+                and "gzip" in request.headers.get("accept-encoding", ""):
+            path = snapshot_path(year_month=year_month, generation=generation)
+            if path:
+                return FileResponse(path, media_type="application/json", headers={
+                    **headers, "Content-Encoding": "gzip", "Vary": "Accept-Encoding"
+                })
+
+        query = apply_data_filters(select(StationData), year_month, station, visitor_number, entry_exit)
+        # 與快照相同依 id 排序，兩種回應的內容順序一致
+        query = query.order_by(StationData.id)
+        results = (await db.execute(query)).scalars().all()
         return results
     except HTTPException:
         raise
@@ -109,8 +205,69 @@ async def get_data(
         logger.error(f"查詢數據時發生錯誤: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/data/batch")
+async def get_data_batch(request: BatchDataRequest, db: AsyncSession = Depends(get_async_read_db)):
+    """以單一 SQL 語句執行多組查詢，結果依各子查詢的 key 分組"""
+    try:
+        keys = [q.key if q.key is not None else str(i) for i, q in enumerate(request.queries)]
+        columns = list(StationData.__table__.columns)
+
+        # 每個子查詢標上序號後以 UNION ALL 合併
+        statements = [
+            apply_data_filters(
+                select(*columns, literal(i, Integer).label("query_index")),
+                q.year_month, q.station, q.visitor_number, q.entry_exit
+            )
+            for i, q in enumerate(request.queries)
+        ]
+        combined = union_all(*statements).subquery()
+        query = select(combined).order_by(combined.c.query_index, combined.c.id)
+
+        results: Dict[str, List[dict]] = {key: [] for key in keys}
+        for row in (await db.execute(query)).mappings():
+            record = dict(row)
+            results[keys[record.pop("query_index")]].append(record)
+        return {"results": results}
+    except Exception as e:
+        logger.error(f"批次查詢數據時發生錯誤: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/snapshots/{filename}")
+async def get_snapshot(filename: str, db: AsyncSession = Depends(get_async_read_db)):
+    """下載目前版本的完整資料快照（data.json.gz / data.csv.gz / data.msgpack.gz）"""
+    if filename not in SNAPSHOT_FILES:
+        raise HTTPException(status_code=404, detail=f"找不到快照檔案: {filename}")
+    # 快照的數據世代與資料庫不一致（尚未重新發布或屬於其他資料庫）時不提供
+    generation = await data_generation.get(lambda: load_data_generation(db), key=db.bind)
+    path = snapshot_path(filename, generation=generation)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"找不到與目前資料一致的快照檔案: {filename}")
+    return FileResponse(path, media_type=SNAPSHOT_FILES[filename], filename=filename,
+                        headers={"X-Snapshot-Version": current_version() or ""})
+
+@app.get("/profiles")
+async def get_profiles():
+    """列出已保存的爬蟲分析結果"""
+    return list_profiles()
+
+@app.get("/profiles/{run_id}")
+async def get_profile(run_id: str):
+    """取得某次爬蟲分析的摘要"""
+    summary = load_profile(run_id)
+    if not summary:
+        raise HTTPException(status_code=404, detail=f"找不到分析結果: {run_id}")
+    return summary
+
+@app.get("/profiles/{run_id}/{filename}")
+async def get_profile_file(run_id: str, filename: str):
+    """下載爬蟲分析檔案（cProfile、tracemalloc、pyinstrument 呼叫樹）"""
+    path = profile_path(run_id, filename)
+    if not path:
+        raise HTTPException(status_code=404, detail=f"找不到分析檔案: {run_id}/{filename}")
+    return FileResponse(path, media_type=PROFILE_FILES[filename], filename=filename)
+
 def main():
-    """主程式入口"""
+    """主程式入口（設定 HSR_PROFILE=1 時記錄執行分析）"""
     try:
         analyzer = HSRAnalyzer()
         
@@ -0,0 +1,255 @@
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import shutil
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.logger import setup_logger
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # pyinstrument 為選用套件
+    PyinstrumentProfiler = None
+
+# 設置日誌
+logger = setup_logger()
+
+# 分析結果的存放目錄
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+# 保留最新的分析結果數量
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+
+# 呼叫樹分析工具（cprofile 或 pyinstrument），兩者都使用 setprofile，同時只能開啟一個；
+# pyinstrument 取樣時的配置也會被 tracemalloc 追蹤，執行明顯變慢，因此預設使用 cProfile
+PROFILE_CALL_TREE = os.getenv("PROFILE_CALL_TREE", "cprofile")
+
+# 可透過 API 下載的分析檔案
+PROFILE_FILES = {
+    "summary.json": "application/json",
+    "cprofile.prof": "application/octet-stream",
+    "cprofile.txt": "text/plain; charset=utf-8",
+    "tracemalloc.txt": "text/plain; charset=utf-8",
+    "pyinstrument.html": "text/html; charset=utf-8",
+}
+
+
+def profiling_enabled() -> bool:
+    """是否以環境變數 HSR_PROFILE 開啟分析"""
+    return os.getenv("HSR_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+class NullProfiler:
+    """未開啟分析時使用，所有操作皆不做事"""
+
+    run_id = None
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class CrawlProfiler:
+    """記錄爬蟲各階段的執行時間與記憶體峰值，並保存呼叫樹"""
+
+    def __init__(self, root: Optional[str] = None, call_tree: Optional[str] = None):
+        self.root = root or PROFILE_DIR
+        self.call_tree = call_tree or PROFILE_CALL_TREE
+        if self.call_tree not in ("pyinstrument", "cprofile"):
+            raise ValueError(f"不支援的呼叫樹分析工具: {self.call_tree}")
+        if self.call_tree == "pyinstrument" and PyinstrumentProfiler is None:
+            logger.warning("未安裝 pyinstrument，改用 cProfile")
+            self.call_tree = "cprofile"
+        self.run_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self.stages: Dict[str, Dict] = {}
+        self._stack: List[Dict] = []
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._pyinstrument = None
+        self._started_at = 0.0
+        self._thread_id: Optional[int] = None
+        # 開始前已在追蹤記憶體時（例如以 python -X tracemalloc 啟動），結束時不停止
+        self._owns_tracemalloc = False
+        self.active = False
+
+    @property
+    def output_dir(self) -> str:
+        return os.path.join(self.root, self.run_id)
+
+    def start(self):
+        """開始記錄"""
+        self.active = True
+        self._started_at = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        # 摘要只使用配置位置的第一層 frame，不記錄完整的呼叫堆疊以降低負擔
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        # 後開啟的工具會取代前者的 setprofile hook，因此只開啟一個
+        if self.call_tree == "pyinstrument":
+            self._pyinstrument = PyinstrumentProfiler()
+            self._pyinstrument.start()
+        else:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        logger.info(f"開始分析爬蟲執行，編號: {self.run_id}，呼叫樹: {self.call_tree}")
+
+    @contextmanager
+    def stage(self, name: str):
+        """記錄一個階段；巢狀階段的記憶體峰值也會計入外層階段"""
+        # 階段的堆疊只屬於開始分析的執行緒，其他執行緒（背景抓取）不記錄
+        if not self.active or threading.get_ident() != self._thread_id:
+            yield
+            return
+
+        # 先把目前為止的峰值記到外層階段，再重新計算本階段的峰值
+        if self._stack:
+            self._stack[-1]["peak"] = max(self._stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        frame = {"peak": 0}
+        self._stack.append(frame)
+        start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            self._stack.pop()
+            peak = max(frame["peak"], peak)
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+
+            record = self.stages.setdefault(name, {
+                "calls": 0, "wall_s": 0.0, "peak_bytes": 0, "peak_above_start_bytes": 0, "net_bytes": 0
+            })
+            record["calls"] += 1
+            record["wall_s"] = round(record["wall_s"] + elapsed, 6)
+            record["peak_bytes"] = max(record["peak_bytes"], peak)
+            record["peak_above_start_bytes"] = max(record["peak_above_start_bytes"], peak - start_memory)
+            record["net_bytes"] += current - start_memory
+
+    def stop(self) -> str:
+        """停止記錄並保存分析檔案，回傳存放目錄"""
+        if not self.active:
+            return self.output_dir
+        self.active = False
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(os.path.join(self.output_dir, "cprofile.prof"))
+            with io.StringIO() as f:
+                pstats.Stats(self._cprofile, stream=f).sort_stats("cumulative").print_stats(50)
+                self._write("cprofile.txt", f.getvalue())
+
+        top = snapshot.statistics("lineno")[:30]
+        self._write("tracemalloc.txt", "\n".join(str(stat) for stat in top))
+        if self._pyinstrument is not None:
+            self._write("pyinstrument.html", self._pyinstrument.output_html())
+
+        summary = {
+            "run_id": self.run_id,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "wall_s": round(time.perf_counter() - self._started_at, 6),
+            "call_tree": self.call_tree,
+            "peak_bytes": max([peak] + [s["peak_bytes"] for s in self.stages.values()]),
+            "stages": self.stages,
+            "top_allocations": [
+                {"location": str(stat.traceback[0]), "size_bytes": stat.size, "count": stat.count} for stat in top[:10]
+            ],
+            "files": sorted(f for f in os.listdir(self.output_dir) if f in PROFILE_FILES) + ["summary.json"],
+        }
+        self._write("summary.json", json.dumps(summary, ensure_ascii=False, indent=2))
+        logger.info(f"爬蟲分析結果已保存到: {self.output_dir}")
+        prune_profiles(self.root, PROFILE_KEEP)
+        return self.output_dir
+
+    def _write(self, filename: str, content: str):
+        with open(os.path.join(self.output_dir, filename), "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.stop()
+        except Exception as e:
+            logger.error(f"保存分析結果時發生錯誤: {e}")
+        return False
+
+
+def profile_stage(name: str):
+    """將方法的執行記錄為 self.profiler 的一個階段"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with self.profiler.stage(name):
+                return func(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def prune_profiles(root: Optional[str] = None, keep: int = PROFILE_KEEP) -> List[str]:
+    """只保留最新的 keep 個分析結果"""
+    root = root or PROFILE_DIR
+    run_ids = sorted(r for r in os.listdir(root) if r.replace("_", "").isdigit())
+    removed = run_ids[:-keep] if keep > 0 else []
+    for run_id in removed:
+        shutil.rmtree(os.path.join(root, run_id), ignore_errors=True)
+    if removed:
+        logger.info(f"已刪除過期的分析結果: {removed}")
+    return removed
+
+
+def list_profiles(root: Optional[str] = None) -> List[Dict]:
+    """列出已保存的分析結果（由新到舊）"""
+    root = root or PROFILE_DIR
+    if not os.path.isdir(root):
+        return []
+    profiles = []
+    for run_id in sorted(os.listdir(root), reverse=True):
+        summary = load_profile(run_id, root)
+        if summary:
+            profiles.append({k: summary[k] for k in ("run_id", "created_at", "wall_s", "peak_bytes")})
+    return profiles
+
+
+def load_profile(run_id: str, root: Optional[str] = None) -> Optional[Dict]:
+    """讀取某次分析的摘要"""
+    path = profile_path(run_id, "summary.json", root)
+    if not path:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def profile_path(run_id: str, filename: str, root: Optional[str] = None) -> Optional[str]:
+    """取得分析檔案的路徑，只允許固定的檔名以避免路徑穿越"""
+    if filename not in PROFILE_FILES or not run_id.replace("_", "").isdigit():
+        return None
+    path = os.path.join(root or PROFILE_DIR, run_id, filename)
+    return path if os.path.isfile(path) else None
@@ -0,0 +1,152 @@
+import csv
+import gzip
+import io
+import json
+import os
+import shutil
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.cache import format_generation
+from app.database.models import StationData
+from app.logger import setup_logger
+
+try:
+    import msgpack
+except ImportError:  # msgpack 為選用套件
+    msgpack = None
+
+# 設置日誌
+logger = setup_logger()
+
+# 快照存放目錄與保留的版本數
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "3"))
+
+COLUMNS = [column.name for column in StationData.__table__.columns]
+
+# 可直接下載的快照檔案
+SNAPSHOT_FILES = {
+    "data.json.gz": "application/gzip",
+    "data.csv.gz": "application/gzip",
+    "data.msgpack.gz": "application/gzip",
+}
+
+def _json_default(value):
+    """與 FastAPI 相同的日期序列化方式"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"無法序列化: {type(value)}")
+
+def _gzip(data: bytes) -> bytes:
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def _encode_json(rows: List[Dict]) -> bytes:
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+def _encode_csv(rows: List[Dict]) -> bytes:
+    with io.StringIO() as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: _json_default(v) if isinstance(v, (datetime, date)) else v for k, v in row.items()})
+        return f.getvalue().encode("utf-8")
+
+def _write(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
+def generation_from_rows(rows: List[Dict]) -> str:
+    """由快照內容計算數據世代，與 API 由資料庫讀取的世代相同"""
+    created = [row["created_at"] for row in rows if row.get("created_at")]
+    return format_generation(
+        len(rows),
+        max((row["id"] for row in rows), default=None),
+        max(created, default=None),
+    )
+
+def write_snapshot(rows: List[Dict], root: Optional[str] = None, version: Optional[str] = None) -> str:
+    """寫入新版本的快照並以原子方式切換 current，回傳版本號"""
+    root = root or SNAPSHOT_DIR
+    version = version or datetime.now().strftime("%Y%m%d%H%M%S%f")
+    versions_dir = os.path.join(root, "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+
+    # 先寫入暫存目錄，完成後才改名為正式版本
+    tmp_dir = os.path.join(versions_dir, f".{version}.tmp")
+    os.makedirs(os.path.join(tmp_dir, "months"))
+    # 記錄快照對應的數據世代，讀取時與資料庫比對，避免回傳過期的快照
+    _write(os.path.join(tmp_dir, "generation"), generation_from_rows(rows).encode("utf-8"))
+    _write(os.path.join(tmp_dir, "data.json.gz"), _gzip(_encode_json(rows)))
+    _write(os.path.join(tmp_dir, "data.csv.gz"), _gzip(_encode_csv(rows)))
+    if msgpack is not None:
+        packed = msgpack.packb(json.loads(_encode_json(rows)), use_bin_type=True)
+        _write(os.path.join(tmp_dir, "data.msgpack.gz"), _gzip(packed))
+
+    by_month: Dict[str, List[Dict]] = {}
+    for row in rows:
+        by_month.setdefault(row["year_month"], []).append(row)
+    for year_month, month_rows in by_month.items():
+        _write(os.path.join(tmp_dir, "months", f"{year_month}.json.gz"), _gzip(_encode_json(month_rows)))
+
+    os.rename(tmp_dir, os.path.join(versions_dir, version))
+
+    # 以 symlink 取代的方式切換，讀取端不會看到寫到一半的版本
+    link_tmp = os.path.join(root, ".current.tmp")
+    if os.path.lexists(link_tmp):
+        os.remove(link_tmp)
+    os.symlink(os.path.join("versions", version), link_tmp)
+    os.replace(link_tmp, os.path.join(root, "current"))
+
+    prune_snapshots(root)
+    logger.info(f"已發布快照版本 {version}，共 {len(rows)} 筆、{len(by_month)} 個月份")
+    return version
+
+def prune_snapshots(root: Optional[str] = None, keep: int = SNAPSHOT_KEEP) -> List[str]:
+    """只保留最新的 keep 個版本"""
+    root = root or SNAPSHOT_DIR
+    versions_dir = os.path.join(root, "versions")
+    current = current_version(root)
+    versions = sorted(v for v in os.listdir(versions_dir) if not v.startswith("."))
+    removed = [v for v in versions[:-keep] if v != current] if keep > 0 else []
+    for version in removed:
+        shutil.rmtree(os.path.join(versions_dir, version), ignore_errors=True)
+    return removed
+
+def current_version(root: Optional[str] = None) -> Optional[str]:
+    """目前使用中的快照版本"""
+    link = os.path.join(root or SNAPSHOT_DIR, "current")
+    if not os.path.islink(link):
+        return None
+    return os.path.basename(os.readlink(link))
+
+def snapshot_generation(version_dir: str) -> Optional[str]:
+    """讀取快照版本對應的數據世代"""
+    try:
+        with open(os.path.join(version_dir, "generation"), encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def snapshot_path(filename: str = "data.json.gz", year_month: Optional[str] = None,
+                  root: Optional[str] = None, generation: Optional[str] = None) -> Optional[str]:
+    """取得目前版本的快照檔案實際路徑；指定 generation 時，快照世代不一致也回傳 None"""
+    # 解析 symlink，確保同一個請求讀取同一個版本
+    version_dir = os.path.realpath(os.path.join(root or SNAPSHOT_DIR, "current"))
+    if generation is not None and snapshot_generation(version_dir) != generation:
+        return None
+    path = os.path.join(version_dir, "months", f"{year_month}.json.gz") if year_month else os.path.join(version_dir, filename)
+    return path if os.path.isfile(path) else None
+
+def publish_snapshots(db: Session, root: Optional[str] = None) -> Optional[str]:
+    """由資料庫產生並發布快照，失敗時不影響寫入流程"""
+    try:
+        table = StationData.__table__
+        rows = [dict(row) for row in db.execute(select(table).order_by(table.c.id)).mappings()]
+        return write_snapshot(rows, root)
+    except Exception as e:
+        logger.error(f"發布快照時發生錯誤: {e}")
+        return None
@@ -4,16 +4,21 @@
 	-- 創建專用用戶（可選，但建議）
 	CREATE USER hsr_user WITH PASSWORD '33taoTHSR';
 
-	-- 創建表格
+	-- 創建表格（依 month 以年為單位分區，分區由 python -m app.database.partitions 建立）
 	CREATE TABLE IF NOT EXISTS hsr_vis_data (
-		id SERIAL PRIMARY KEY,
+		id SERIAL,
+		"month" DATE NOT NULL,
 		"year_month" VARCHAR(20),
 		"station_sequence" INTEGER,
 		"station" VARCHAR(100),
 		"visitor_number" INTEGER,
 		"entry_exit" VARCHAR(10),
-		"created_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-	);
+		"created_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+		PRIMARY KEY (id, "month")
+	) PARTITION BY RANGE ("month");
+
+	CREATE INDEX IF NOT EXISTS ix_hsr_vis_data_month_brin ON hsr_vis_data USING brin ("month");
+	CREATE INDEX IF NOT EXISTS ix_hsr_vis_data_id ON hsr_vis_data (id);
 	
 	-- 授予權限
 	GRANT ALL PRIVILEGES ON DATABASE hsr_data TO hsr_user;
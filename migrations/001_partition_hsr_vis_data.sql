@@ -0,0 +1,63 @@
+-- 將 hsr_vis_data 轉換為依 month（DATE）以年為單位的範圍分區表
+-- 執行方式：psql -d hsr_data -f migrations/001_partition_hsr_vis_data.sql
+-- 之後每年由 `python -m app.database.partitions` 預先建立未來的分區
+
+BEGIN;
+
+-- 1. 保留舊表與其序列，讓 id 延續
+ALTER TABLE hsr_vis_data RENAME TO hsr_vis_data_legacy;
+-- 索引名稱不會隨資料表改名，先改名以免與新表的主鍵及索引衝突
+ALTER INDEX hsr_vis_data_pkey RENAME TO hsr_vis_data_legacy_pkey;
+ALTER INDEX IF EXISTS ix_hsr_vis_data_id RENAME TO ix_hsr_vis_data_legacy_id;
+ALTER INDEX IF EXISTS ix_hsr_vis_data_year_month RENAME TO ix_hsr_vis_data_legacy_year_month;
+ALTER SEQUENCE hsr_vis_data_id_seq OWNED BY NONE;
+
+-- 2. 建立分區主表（分區鍵必須包含在主鍵中）
+CREATE TABLE hsr_vis_data (
+	id INTEGER NOT NULL DEFAULT nextval('hsr_vis_data_id_seq'),
+	"month" DATE NOT NULL,
+	"year_month" VARCHAR(20),
+	"station_sequence" INTEGER,
+	"station" VARCHAR(100),
+	"visitor_number" INTEGER,
+	"entry_exit" VARCHAR(10),
+	"created_at" TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+	PRIMARY KEY (id, "month")
+) PARTITION BY RANGE ("month");
+
+ALTER SEQUENCE hsr_vis_data_id_seq OWNED BY hsr_vis_data.id;
+
+-- 3. 建立自通車年度（或舊資料最早年度）到未來兩年的年度分區
+DO $$
+DECLARE
+	first_year INTEGER;
+	y INTEGER;
+BEGIN
+	SELECT LEAST(2007, COALESCE(MIN(substring("year_month" FROM 1 FOR 4)::INTEGER), 2007))
+	INTO first_year
+	FROM hsr_vis_data_legacy;
+
+	FOR y IN first_year .. EXTRACT(YEAR FROM CURRENT_DATE)::INTEGER + 2 LOOP
+		EXECUTE format(
+			'CREATE TABLE IF NOT EXISTS %I PARTITION OF hsr_vis_data FOR VALUES FROM (%L) TO (%L)',
+			'hsr_vis_data_y' || y, make_date(y, 1, 1), make_date(y + 1, 1, 1)
+		);
+	END LOOP;
+END $$;
+
+-- 4. 搬移資料，由 year_month 推導 month
+INSERT INTO hsr_vis_data (id, "month", "year_month", "station_sequence", "station", "visitor_number", "entry_exit", "created_at")
+SELECT id,
+	make_date(substring("year_month" FROM 1 FOR 4)::INTEGER, substring("year_month" FROM 6 FOR 2)::INTEGER, 1),
+	"year_month", "station_sequence", "station", "visitor_number", "entry_exit", "created_at"
+FROM hsr_vis_data_legacy;
+
+DROP TABLE hsr_vis_data_legacy;
+
+-- 5. 索引：month 依寫入順序遞增，BRIN 比 B-tree 小得多
+CREATE INDEX IF NOT EXISTS ix_hsr_vis_data_month_brin ON hsr_vis_data USING brin ("month");
+CREATE INDEX IF NOT EXISTS ix_hsr_vis_data_id ON hsr_vis_data (id);
+
+COMMIT;
+
+ANALYZE hsr_vis_data;
@@ -0,0 +1,17 @@
+import pytest
+
+from fake_thsr import FakeTHSRServer
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    """快照寫入暫存目錄，避免讀到專案目錄中其他資料庫發布的快照"""
+    path = tmp_path / "snapshots"
+    monkeypatch.setattr("app.snapshots.SNAPSHOT_DIR", str(path))
+    return path
+
+@pytest.fixture
+def fake_thsr(monkeypatch):
+    """啟動本地模擬高鐵網站，並讓爬蟲改連到該網站"""
+    with FakeTHSRServer() as server:
+        monkeypatch.setenv("THSR_BASE_URL", server.url)
+        yield server
@@ -0,0 +1,181 @@
+"""本地模擬的高鐵網站，提供離線且可重現的爬蟲測試與效能量測
+
+可單獨啟動供手動量測使用：
+    python tests/fake_thsr.py --port 8765 --months 24
+    THSR_BASE_URL=http://127.0.0.1:8765/corp/fake python -m app.main
+"""
+import argparse
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+from typing import List, Optional
+from urllib.parse import urlparse
+
+STATIONS = ["南港", "台北", "板橋", "桃園", "新竹", "苗栗", "台中", "彰化", "雲林", "嘉義", "台南", "左營"]
+
+PAGE_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="zh-TW">
+<head><meta charset="utf-8"><title>各站進出旅客人數</title></head>
+<body>
+  <ul class="nav nav-tabs">
+$tabs
+  </ul>
+  <div class="tab-content">
+$panes
+  </div>
+</body>
+</html>
+""")
+
+TAB_TEMPLATE = Template("""    <li><a href="#$tab_id" data-toggle="tab">$label</a></li>""")
+
+PANE_TEMPLATE = Template("""    <div id="$tab_id" class="tab-pane">
+      <table class="table">
+        <thead><tr>$header</tr></thead>
+        <tbody>
+$rows
+        </tbody>
+      </table>
+    </div>""")
+
+# 可注入的版面變化
+LAYOUTS = ("default", "no_tabs", "duplicate_panes", "renamed_columns")
+
+
+def recent_months(count: int, until: Optional[datetime] = None) -> List[str]:
+    """產生到上個月為止的 count 個月份（由新到舊）"""
+    current = (until or datetime.now()).replace(day=1) - timedelta(days=1)
+    months = []
+    for _ in range(count):
+        months.append(current.strftime("%Y-%m"))
+        current = current.replace(day=1) - timedelta(days=1)
+    return months
+
+
+def visitor_number(year_month: str, station: str, label: str) -> int:
+    """可重現的旅客人數"""
+    return 50_000 + zlib.crc32(f"{year_month}|{station}|{label}".encode("utf-8")) % 1_950_000
+
+
+class FakeTHSRServer:
+    """以模板產生頁面的模擬高鐵網站"""
+
+    path = "/corp/fake"
+
+    def __init__(self, months: int = 12, entry_tab: str = "tab1", exit_tab: str = "tab2",
+                 latency: float = 0.0, layout: str = "default", host: str = "127.0.0.1", port: int = 0):
+        self.months = months
+        self.entry_tab = entry_tab
+        self.exit_tab = exit_tab
+        self.latency = latency
+        self.layout = layout
+        # 接下來 N 個請求要回傳的錯誤狀態碼
+        self.errors: List[int] = []
+        # 為 True 時一律回傳 304 Not Modified
+        self.not_modified = False
+        self.requests: List[str] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}{self.path}"
+
+    def fail_next(self, status: int = 500, times: int = 1):
+        """讓接下來的 times 個請求回傳指定錯誤"""
+        with self._lock:
+            self.errors.extend([status] * times)
+
+    def render(self) -> str:
+        """依目前設定產生頁面"""
+        if self.layout not in LAYOUTS:
+            raise ValueError(f"未知的版面: {self.layout}")
+        months = recent_months(self.months)
+        first_column = "年月" if self.layout == "renamed_columns" else "年度 / 月份"
+        header = "".join(f"<th>{name}</th>" for name in [first_column, *STATIONS, "總計"])
+
+        tabs, panes = [], []
+        for tab_id, label in ((self.entry_tab, "進站"), (self.exit_tab, "出站")):
+            if self.layout != "no_tabs":
+                tabs.append(TAB_TEMPLATE.substitute(tab_id=tab_id, label=label))
+            rows = []
+            for year_month in months:
+                values = [visitor_number(year_month, station, label) for station in STATIONS]
+                cells = "".join(f"<td>{v}</td>" for v in [year_month, *values, sum(values)])
+                rows.append(f"          <tr>{cells}</tr>")
+            pane = PANE_TEMPLATE.substitute(tab_id=tab_id, header=header, rows="\n".join(rows))
+            panes.append(pane)
+            if self.layout == "duplicate_panes":
+                panes.append(pane)
+        return PAGE_TEMPLATE.substitute(tabs="\n".join(tabs), panes="\n".join(panes))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.requests.append(self.path)
+                    status = server.errors.pop(0) if server.errors else None
+                if server.latency:
+                    time.sleep(server.latency)
+                if status:
+                    self.send_error(status)
+                    return
+                if server.not_modified:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                if urlparse(self.path).path != server.path:
+                    self.send_error(404)
+                    return
+                body = server.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "FakeTHSRServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地模擬高鐵網站")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--layout", choices=LAYOUTS, default="default")
+    args = parser.parse_args()
+
+    fake = FakeTHSRServer(months=args.months, latency=args.latency, layout=args.layout, port=args.port)
+    print(f"模擬高鐵網站: {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        fake._server.server_close()
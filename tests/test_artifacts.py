@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import pandas as pd
+
+from app.artifacts import ArtifactStore
+
+def write_csv(df, path):
+    df.to_csv(path, index=False)
+
+def make_df(months, value=1):
+    return pd.DataFrame({"year_month": months, "station": "台北", "visitor_number": value})
+
+def test_deduplicate(tmp_path):
+    """測試相同內容只產生一次"""
+    store = ArtifactStore(root=str(tmp_path))
+    path, created = store.put(make_df(["2024-01", "2024-02"]), "entry", write_csv, suffix=".csv")
+    assert created
+    path_again, created_again = store.put(make_df(["2024-01", "2024-02"]), "entry", write_csv, suffix=".csv")
+    assert not created_again
+    assert path_again == path
+
+    # 相同資料但類型不同時分開保存
+    _, created_exit = store.put(make_df(["2024-01", "2024-02"]), "exit", write_csv, suffix=".csv")
+    assert created_exit
+    assert len(list((tmp_path / "objects").rglob("*.csv"))) == 2
+
+def test_latest_lookup(tmp_path):
+    """測試依月份查詢最新檔案，並可由索引重新載入"""
+    store = ArtifactStore(root=str(tmp_path))
+    first, _ = store.put(make_df(["2024-01"]), "entry", write_csv, suffix=".csv")
+    second, _ = store.put(make_df(["2024-01", "2024-02"]), "entry", write_csv, suffix=".csv")
+
+    reloaded = ArtifactStore(root=str(tmp_path))
+    assert reloaded.latest("entry", "2024-01") == second
+    assert reloaded.latest("entry", "2024-02") == second
+    assert reloaded.latest("entry", "2023-12") is None
+    assert reloaded.get(ArtifactStore.content_hash(make_df(["2024-01"]), "entry")) == first
+
+def test_retention(tmp_path):
+    """測試超過保留數量且不是任何月份最新的檔案會被刪除"""
+    store = ArtifactStore(root=str(tmp_path), retention=1)
+    old, _ = store.put(make_df(["2024-01"], value=1), "entry", write_csv, suffix=".csv")
+    new, _ = store.put(make_df(["2024-01"], value=2), "entry", write_csv, suffix=".csv")
+
+    assert not Path(old).exists()
+    assert Path(new).exists()
+    assert store.latest("entry", "2024-01") == new
+    assert len(store.manifest["objects"]) == 1
+
+def test_retention_rolling_window(tmp_path):
+    """測試每次爬取涵蓋最近幾個月份的滾動視窗時，舊檔案仍會被刪除"""
+    store = ArtifactStore(root=str(tmp_path), retention=2)
+    months = [f"2024-{m:02d}" for m in range(1, 13)]
+    paths = []
+    for start in range(6):
+        path, created = store.put(make_df(months[start:start + 3]), "entry", write_csv, suffix=".csv")
+        assert created
+        paths.append(path)
+
+    assert len(store.manifest["objects"]) == 2
+    assert sorted(p.name for p in (tmp_path / "objects").rglob("*.csv")) == sorted(Path(p).name for p in paths[-2:])
+    # 只保留最新 2 個月份的指標
+    assert store.latest("entry", "2024-08") == paths[-1]
+    assert store.latest("entry", "2024-07") == paths[-1]
+    assert store.latest("entry", "2024-06") is None
+    assert store.latest("entry", "2024-01") is None
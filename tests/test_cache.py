@@ -0,0 +1,62 @@
+import sys
+import asyncio
+from pathlib import Path
+from datetime import datetime, timezone
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from app import cache
+from app.cache import DataGeneration, seconds_since_last_crawl, seconds_until_next_crawl, shared_max_age
+
+def test_crawl_schedule():
+    """測試距離上一次與下一次排程爬取的秒數（含跨年）"""
+    now = datetime(2024, 12, 31, 23, 0, tzinfo=timezone.utc)
+    assert seconds_until_next_crawl(now) == 6 * 3600
+    assert seconds_since_last_crawl(now) == (30 * 24 + 18) * 3600
+
+    now = datetime(2024, 1, 1, 4, 0, tzinfo=timezone.utc)
+    assert seconds_until_next_crawl(now) == 3600
+    assert seconds_since_last_crawl(now) == (31 * 24 - 1) * 3600
+
+def test_shared_max_age():
+    """測試 s-maxage 在排程後的寬限期內縮短，且不超過上限"""
+    # 排程時間剛過，爬取可能尚未完成
+    assert shared_max_age(datetime(2024, 1, 1, 5, 0, 1, tzinfo=timezone.utc)) == cache.GENERATION_TTL
+    # 月中不超過上限
+    assert shared_max_age(datetime(2024, 1, 15, tzinfo=timezone.utc)) == cache.MAX_SHARED_AGE
+    # 接近下一次排程時不超過剩餘時間
+    assert shared_max_age(datetime(2024, 2, 1, 4, 59, tzinfo=timezone.utc)) == 60
+
+def test_crawl_schedule_end_of_month(monkeypatch):
+    """測試排程日超過該月天數時改用月底"""
+    monkeypatch.setattr(cache, "CRAWL_DAY", 31)
+    now = datetime(2024, 2, 15, tzinfo=timezone.utc)
+    assert seconds_until_next_crawl(now) == (14 * 24 + 5) * 3600
+    assert seconds_since_last_crawl(now) == (15 * 24 - 5) * 3600
+    assert shared_max_age(datetime(2024, 4, 30, 6, tzinfo=timezone.utc)) == cache.GENERATION_TTL
+
+def test_generation_per_engine():
+    """測試主資料庫與讀取副本的世代分開快取"""
+    generation = DataGeneration(ttl=60)
+    values = {"primary": "2:2:", "replica": "1:1:"}
+    calls = []
+
+    def loader(key):
+        async def load():
+            calls.append(key)
+            return values[key]
+        return load
+
+    async def run():
+        assert await generation.get(loader("primary"), key="primary") == "2:2:"
+        assert await generation.get(loader("replica"), key="replica") == "1:1:"
+        # TTL 內沿用各自的快取
+        assert await generation.get(loader("primary"), key="primary") == "2:2:"
+        assert await generation.get(loader("replica"), key="replica") == "1:1:"
+        generation.invalidate()
+        assert await generation.get(loader("replica"), key="replica") == "1:1:"
+
+    asyncio.run(run())
+    assert calls == ["primary", "replica", "replica"]
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import pytest
+import pandas as pd
+
+from app.crawler.extractors import EXTRACTORS, ExtractorRunner
+from app.crawler.scraper import HSRAnalyzer
+from app.crawler.sources import STATIONS, STATION_KEY_COLUMNS
+
+def test_base_url_override(fake_thsr):
+    """測試 base_url 可由參數或環境變數覆寫"""
+    assert HSRAnalyzer().base_url == fake_thsr.url
+    assert HSRAnalyzer(base_url="http://example.invalid/").base_url == "http://example.invalid/"
+
+def test_passenger_sources_registered():
+    """測試進站、出站表格以資料來源註冊"""
+    for name in ["entry_passenger_table", "exit_passenger_table"]:
+        assert EXTRACTORS[name].url is None
+        assert EXTRACTORS[name].key_columns == STATION_KEY_COLUMNS
+
+def test_skip_invalid_year_month():
+    """測試年月無法解析的列被略過，不影響其他月份"""
+    rows = [["2024-01", *range(13)], ["總計", *range(13)], [None, *range(13)]]
+    df = pd.DataFrame(rows, columns=["年度 / 月份", *STATIONS])
+    result = EXTRACTORS["entry_passenger_table"].transform(df)
+    assert set(result["year_month"]) == {"2024-01"}
+    assert len(result) == len(STATIONS)
+
+def test_parse_fake_site(fake_thsr):
+    """測試解析模擬網站的進出站表格"""
+    fake_thsr.months = 6
+    fake_thsr.entry_tab, fake_thsr.exit_tab = "entryPane", "exitPane"
+    analyzer = HSRAnalyzer()
+
+    results = analyzer.runner.extract_all()
+    df = results["entry_passenger_table"]
+    assert len(df) == 6 * 13
+    assert set(df["entry_exit"]) == {"進站"}
+    assert df["station_sequence"].between(1, 13).all()
+    assert set(results["exit_passenger_table"]["entry_exit"]) == {"出站"}
+    # 進站、出站在同一個網頁，只抓取一次
+    assert len(fake_thsr.requests) == 1
+
+def test_crawl_end_to_end(fake_thsr, tmp_path, monkeypatch):
+    """測試完整爬取流程（不寫入資料庫）"""
+    monkeypatch.chdir(tmp_path)
+    assert set(HSRAnalyzer().extract_tables()) == {"entry_passenger_table", "exit_passenger_table"}
+    assert len(fake_thsr.requests) == 1
+    assert len(list((tmp_path / "output").rglob("*.xlsx"))) == 2
+
+    # 內容未變動時不會產生新的 Excel 檔案
+    HSRAnalyzer().extract_tables()
+    assert len(list((tmp_path / "output").rglob("*.xlsx"))) == 2
+
+def test_fetch_errors(fake_thsr):
+    """測試錯誤與 304 回應"""
+    analyzer = HSRAnalyzer()
+    fake_thsr.fail_next(503)
+    assert analyzer.get_page_content() is None
+    assert analyzer.get_page_content() is not None
+
+    fake_thsr.not_modified = True
+    assert analyzer.get_page_content() is None
+    assert analyzer.runner.extract_all() == {}
+
+@pytest.mark.parametrize("layout", ["no_tabs", "duplicate_panes", "renamed_columns"])
+def test_layout_changes(fake_thsr, layout):
+    """測試版面變動時不會產生錯誤資料"""
+    fake_thsr.layout = layout
+    assert HSRAnalyzer().runner.extract_all() == {}
+
+def test_shared_pool_size():
+    """測試連線池保留主執行緒的連線"""
+    from app.crawler.extractors import MAX_WORKERS
+    adapter = HSRAnalyzer().session.get_adapter("https://www.thsrc.com.tw/")
+    assert adapter._pool_maxsize == MAX_WORKERS + 1
+    assert ExtractorRunner([]).session.get_adapter("http://x/")._pool_maxsize == MAX_WORKERS + 1
@@ -0,0 +1,135 @@
+import sys
+import time
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import pytest
+import pandas as pd
+from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+from app.crawler.extractors import (
+    ExtractorRunner, ExtractorSource, css_locator, get_extractors,
+    register_extractor, tab_locator
+)
+from app.database.models import StationData
+
+KEYS = ["year_month", "station", "entry_exit"]
+
+PAGE = """
+<html><body>
+  <a href="#tab1">進站</a>
+  <a href="#tab2">出站</a>
+  <div id="tab1"><table>
+    <tr><th>年度 / 月份</th><th>南港</th><th>台北</th></tr>
+    <tr><td>2024-01</td><td>10</td><td>20</td></tr>
+  </table></div>
+  <div id="tab2"><table>
+    <tr><th>年度 / 月份</th><th>南港</th><th>台北</th></tr>
+    <tr><td>2024-01</td><td>11</td><td>21</td></tr>
+  </table></div>
+</body></html>
+"""
+
+
+def melt_stations(table_type):
+    """測試用的轉換：寬表轉為長表"""
+    def transform(df):
+        df = df.melt(id_vars=["年度 / 月份"], var_name="station", value_name="visitor_number")
+        df = df.rename(columns={"年度 / 月份": "year_month"})
+        df["entry_exit"] = table_type
+        return df
+    return transform
+
+
+@pytest.fixture
+def sources():
+    return [
+        ExtractorSource("entry", "http://fake/page", tab_locator("進站"), melt_stations("進站"), StationData, KEYS),
+        ExtractorSource("exit", "http://fake/page", tab_locator("出站"), melt_stations("出站"), StationData, KEYS),
+        ExtractorSource("other", "http://fake/other", css_locator("div#tab1"), melt_stations("進站"), StationData, KEYS),
+    ]
+
+
+def test_extract(sources):
+    """測試表格定位與轉換"""
+    df = sources[1].extract(PAGE)
+    assert list(df.columns) == ["year_month", "station", "visitor_number", "entry_exit"]
+    assert df["visitor_number"].tolist() == [11, 21]
+    assert set(df["entry_exit"]) == {"出站"}
+
+
+def test_missing_table(sources):
+    """測試找不到表格時拋出錯誤"""
+    source = ExtractorSource("missing", "http://fake/page", css_locator("div#none"), melt_stations("進站"), StationData, KEYS)
+    with pytest.raises(ValueError):
+        source.extract(PAGE)
+
+
+def test_runner_fetches_concurrently(sources, monkeypatch):
+    """測試同一網頁只抓取一次，且不同網頁同時抓取"""
+    fetched = []
+
+    def fake_fetch(url, params):
+        fetched.append(url)
+        time.sleep(0.3)
+        return PAGE
+
+    runner = ExtractorRunner(sources, max_workers=4)
+    monkeypatch.setattr(runner, "fetch", fake_fetch)
+
+    start = time.perf_counter()
+    results = runner.run()
+    elapsed = time.perf_counter() - start
+
+    assert sorted(fetched) == ["http://fake/other", "http://fake/page"]
+    assert set(results) == {"entry", "exit", "other"}
+    assert elapsed < 0.55
+
+
+def test_register_extractor(sources, monkeypatch):
+    """測試註冊資料來源"""
+    monkeypatch.setattr("app.crawler.extractors.EXTRACTORS", {})
+    register_extractor(sources[0])
+    assert get_extractors() == [sources[0]]
+    with pytest.raises(ValueError):
+        register_extractor(sources[0])
+
+
+def test_source_requires_keys():
+    """測試未指定去重鍵值時拒絕建立資料來源"""
+    with pytest.raises(ValueError):
+        ExtractorSource("nokey", "http://fake/page", css_locator("div#tab1"), melt_stations("進站"), StationData, [])
+
+
+def test_save_skips_existing_keys():
+    """測試重複爬取時只寫入新的鍵值"""
+    Base = declarative_base()
+
+    class Visitors(Base):
+        __tablename__ = "visitors"
+        id = Column(Integer, primary_key=True)
+        year_month = Column(String)
+        station = Column(String)
+        visitor_number = Column(Integer)
+        entry_exit = Column(String)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    source = ExtractorSource("entry", "http://fake/page", tab_locator("進站"), melt_stations("進站"), Visitors, KEYS)
+    runner = ExtractorRunner([source])
+
+    df = source.extract(PAGE)
+    assert runner.save(db, source, df)
+    assert runner.save(db, source, df)
+    assert db.query(Visitors).count() == 2
+
+    # 新月份的資料才會寫入
+    df_next = df.assign(year_month="2024-02")
+    assert runner.save(db, source, pd.concat([df, df_next, df_next]))
+    assert db.query(Visitors).count() == 4
+    db.close()
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from app.loadtest import percentile, summarize, synthetic_rows
+
+def test_percentile():
+    """測試百分位數計算"""
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) == 0.0
+
+def test_synthetic_rows():
+    """測試合成資料的筆數與格式"""
+    rows = synthetic_rows(2, end_year=2024)
+    # 2 年 x 12 個月 x 進出站 x (12 站 + 總計)
+    assert len(rows) == 2 * 12 * 2 * 13
+    assert rows[0]["year_month"] == "2023-01"
+    assert rows[-1]["year_month"] == "2024-12"
+    assert {row["entry_exit"] for row in rows} == {"進站", "出站"}
+
+def test_summarize():
+    """測試結果摘要"""
+    result = summarize({"GET /data": [1.0, 2.0, 3.0, 4.0]}, {"GET /data": 1}, elapsed=2.0)
+    assert result["endpoints"]["GET /data"]["requests"] == 4
+    assert result["endpoints"]["GET /data"]["errors"] == 1
+    assert result["endpoints"]["GET /data"]["throughput_rps"] == 2.0
+    assert result["total"]["p99_ms"] == 4.0
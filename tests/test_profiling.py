@@ -0,0 +1,119 @@
+import sys
+import json
+import tracemalloc
+from pathlib import Path
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.profiling import CrawlProfiler, NullProfiler, profile_path, prune_profiles
+from app.crawler.scraper import HSRAnalyzer
+
+def test_nested_stages(tmp_path):
+    """測試巢狀階段的時間與記憶體峰值"""
+    with CrawlProfiler(root=str(tmp_path), call_tree="cprofile") as profiler:
+        with profiler.stage("excel"):
+            with profiler.stage("transform"):
+                data = bytearray(2 * 1024 * 1024)
+                del data
+        with profiler.stage("transform"):
+            pass
+
+    summary = json.loads((tmp_path / profiler.run_id / "summary.json").read_text(encoding="utf-8"))
+    assert summary["stages"]["transform"]["calls"] == 2
+    assert summary["stages"]["transform"]["peak_above_start_bytes"] >= 2 * 1024 * 1024
+    # 內層的峰值也會計入外層
+    assert summary["stages"]["excel"]["peak_above_start_bytes"] >= 2 * 1024 * 1024
+    for filename in ["cprofile.prof", "cprofile.txt", "tracemalloc.txt"]:
+        assert filename in summary["files"]
+        assert profile_path(profiler.run_id, filename, root=str(tmp_path))
+    assert "pyinstrument.html" not in summary["files"]
+
+def test_keep_existing_tracemalloc(tmp_path):
+    """測試開始前已在追蹤記憶體時，結束後不停止追蹤"""
+    tracemalloc.start()
+    try:
+        with CrawlProfiler(root=str(tmp_path)):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    with CrawlProfiler(root=str(tmp_path)):
+        pass
+    assert not tracemalloc.is_tracing()
+
+def test_prune_profiles(tmp_path, monkeypatch):
+    """測試只保留最新的分析結果"""
+    for run_id in ["20240101_000000_000000", "20240102_000000_000000", "20240103_000000_000000"]:
+        (tmp_path / run_id).mkdir()
+    (tmp_path / "notes").mkdir()
+    assert prune_profiles(str(tmp_path), keep=2) == ["20240101_000000_000000"]
+    assert (tmp_path / "notes").exists()
+
+    # 每次分析結束時自動清理
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 1)
+    with CrawlProfiler(root=str(tmp_path)) as profiler:
+        pass
+    assert sorted(p.name for p in tmp_path.iterdir()) == [profiler.run_id, "notes"]
+
+@pytest.mark.skipif(profiling.PyinstrumentProfiler is None, reason="未安裝 pyinstrument")
+def test_pyinstrument_call_tree(tmp_path):
+    """測試使用 pyinstrument 時不會同時開啟 cProfile"""
+    with CrawlProfiler(root=str(tmp_path), call_tree="pyinstrument") as profiler:
+        with profiler.stage("transform"):
+            sum(i * i for i in range(100_000))
+
+    summary = json.loads((tmp_path / profiler.run_id / "summary.json").read_text(encoding="utf-8"))
+    assert summary["call_tree"] == "pyinstrument"
+    assert "pyinstrument.html" in summary["files"]
+    assert "cprofile.prof" not in summary["files"]
+    # 呼叫樹不應被其他分析工具的 hook 取代而成為空白
+    html = (tmp_path / profiler.run_id / "pyinstrument.html").read_text(encoding="utf-8")
+    assert "test_pyinstrument_call_tree" in html
+
+def test_crawl_profile(fake_thsr, tmp_path, monkeypatch):
+    """測試爬取流程各階段都有被記錄"""
+    monkeypatch.chdir(tmp_path)
+    profiler = CrawlProfiler(root=str(tmp_path / "profiles"))
+    analyzer = HSRAnalyzer(profiler=profiler)
+    with profiler:
+        analyzer.extract_tables()
+
+    assert {"fetch", "parse", "read_html", "transform", "excel"} <= set(profiler.stages)
+    assert profiler.stages["fetch"]["calls"] == 1
+    assert profiler.stages["transform"]["calls"] == 2
+
+def test_profiling_env(monkeypatch):
+    """測試以環境變數開啟分析"""
+    monkeypatch.delenv("HSR_PROFILE", raising=False)
+    assert isinstance(HSRAnalyzer().profiler, NullProfiler)
+    monkeypatch.setenv("HSR_PROFILE", "1")
+    assert isinstance(HSRAnalyzer().profiler, CrawlProfiler)
+
+def test_profile_endpoints(tmp_path, monkeypatch):
+    """測試透過 API 取得分析結果"""
+    from app.main import app
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    with CrawlProfiler(call_tree="cprofile") as profiler:
+        with profiler.stage("fetch"):
+            pass
+
+    client = TestClient(app)
+    response = client.get("/profiles")
+    assert response.status_code == 200
+    assert [item["run_id"] for item in response.json()] == [profiler.run_id]
+
+    response = client.get(f"/profiles/{profiler.run_id}")
+    assert response.status_code == 200
+    assert "fetch" in response.json()["stages"]
+
+    response = client.get(f"/profiles/{profiler.run_id}/cprofile.txt")
+    assert response.status_code == 200
+    assert client.get(f"/profiles/{profiler.run_id}/..%2Fsecret").status_code == 404
+    assert client.get("/profiles/unknown").status_code == 404
@@ -0,0 +1,59 @@
+import sys
+import gzip
+import json
+import os
+from pathlib import Path
+from datetime import datetime
+
+# 添加專案根目錄到 Python 路徑
+project_root = str(Path(__file__).parent.parent)
+sys.path.insert(0, project_root)
+
+from app.snapshots import current_version, generation_from_rows, snapshot_path, write_snapshot
+
+def make_rows():
+    return [
+        {"id": i, "month": None, "year_month": year_month, "station_sequence": 2, "station": "台北",
+         "visitor_number": i, "entry_exit": "進站", "created_at": datetime(2024, 3, 1)}
+        for i, year_month in enumerate(["2024-01", "2024-01", "2024-02"], start=1)
+    ]
+
+def test_write_snapshot(tmp_path):
+    """測試快照內容與每月檔案"""
+    version = write_snapshot(make_rows(), root=str(tmp_path), version="001")
+    assert version == "001"
+    assert current_version(str(tmp_path)) == "001"
+
+    with gzip.open(snapshot_path(root=str(tmp_path))) as f:
+        data = json.load(f)
+    assert [row["id"] for row in data] == [1, 2, 3]
+    assert data[0]["created_at"] == "2024-03-01T00:00:00"
+
+    with gzip.open(snapshot_path(year_month="2024-01", root=str(tmp_path))) as f:
+        assert len(json.load(f)) == 2
+    assert snapshot_path(year_month="2023-12", root=str(tmp_path)) is None
+
+    with gzip.open(snapshot_path("data.csv.gz", root=str(tmp_path)), "rt", encoding="utf-8") as f:
+        assert f.readline().startswith("id,month,year_month")
+
+def test_atomic_swap_and_prune(tmp_path):
+    """測試切換版本與舊版本清理"""
+    for version in ["001", "002", "003", "004"]:
+        write_snapshot(make_rows()[:int(version)], root=str(tmp_path), version=version)
+
+    assert current_version(str(tmp_path)) == "004"
+    assert sorted(os.listdir(tmp_path / "versions")) == ["002", "003", "004"]
+    # 舊版本的路徑在切換後仍可讀取
+    assert snapshot_path(root=str(tmp_path)).endswith(os.path.join("004", "data.json.gz"))
+    assert not list((tmp_path / "versions").glob(".*"))
+
+def test_generation_mismatch(tmp_path):
+    """測試快照世代與目前資料不一致時不回傳快照"""
+    rows = make_rows()
+    write_snapshot(rows, root=str(tmp_path))
+
+    generation = generation_from_rows(rows)
+    assert generation == "3:3:2024-03-01T00:00:00"
+    assert snapshot_path(root=str(tmp_path), generation=generation) is not None
+    assert snapshot_path(year_month="2024-01", root=str(tmp_path), generation=generation) is not None
+    assert snapshot_path(root=str(tmp_path), generation=generation_from_rows(rows[:2])) is None